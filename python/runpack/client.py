@@ -1,13 +1,23 @@
 """API client for communicating with the Runpack worker."""
 
+import gzip
+import json
 import logging
 from typing import Any, Dict, List, Optional
 
 import requests
+from requests.adapters import HTTPAdapter
 
 
 logger = logging.getLogger(__name__)
 
+# Heartbeat payloads larger than this are sent gzip-compressed
+GZIP_MIN_SIZE = 4 * 1024  # bytes
+
+# Heartbeat requests give up after this long, so a job's heartbeat sender
+# always finishes within the runner's HEARTBEAT_STOP_TIMEOUT
+HEARTBEAT_TIMEOUT = 10  # seconds
+
 
 class RunpackClient:
     """Client for interacting with the Runpack worker API."""
@@ -22,6 +32,15 @@ class RunpackClient:
         self.worker_url = worker_url.rstrip('/')
         self.api_key = api_key
         self.runner_id: Optional[str] = None
+        # Set once the worker confirms it accepts console_append heartbeats.
+        # Workers that do also accept gzip-compressed heartbeat bodies.
+        self.console_append_supported = False
+        
+        # Reuse connections across polls, heartbeats and job updates
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=4)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
 
     def _headers(self) -> Dict[str, str]:
         """Get request headers including authentication.
@@ -37,6 +56,23 @@ class RunpackClient:
             headers['X-Runner-ID'] = self.runner_id
         return headers
 
+    @staticmethod
+    def _endpoint_missing(response: requests.Response) -> bool:
+        """Check whether a response means the worker doesn't have the endpoint.
+        
+        Older workers answer unknown routes with 404 {"error": "Not found"};
+        other 404s come from the endpoint itself and must not be mistaken
+        for a missing endpoint.
+        """
+        if response.status_code == 501:
+            return True
+        if response.status_code != 404:
+            return False
+        try:
+            return response.json().get('error') == 'Not found'
+        except ValueError:
+            return False
+
     def register_runner(self, name: str, capabilities: List[str]) -> str:
         """Register this runner with the worker.
         
@@ -58,7 +94,7 @@ class RunpackClient:
         
         logger.info(f"Registering runner '{name}' with capabilities: {capabilities}")
         
-        response = requests.post(url, json=data, headers=self._headers())
+        response = self.session.post(url, json=data, headers=self._headers())
         response.raise_for_status()
         
         result = response.json()
@@ -85,7 +121,7 @@ class RunpackClient:
         logger.debug(f"Verifying runner ID: {self.runner_id}")
         
         try:
-            response = requests.get(url, headers=self._headers())
+            response = self.session.get(url, headers=self._headers())
             
             if response.status_code == 404:
                 # Runner not found in system
@@ -118,12 +154,73 @@ class RunpackClient:
         url = f"{self.worker_url}/api/runner/jobs/available"
         params = {'types[]': job_types}
         
-        response = requests.get(url, params=params, headers=self._headers())
+        response = self.session.get(url, params=params, headers=self._headers())
+        response.raise_for_status()
+        
+        result = response.json()
+        return result.get('jobs', [])
+
+    def long_poll_jobs(self, job_types: List[str], timeout: int = 60) -> Optional[List[Dict[str, Any]]]:
+        """Wait for available jobs matching the specified types.
+        
+        The worker holds the request open until matching jobs are available
+        or the timeout elapses.
+        
+        Args:
+            job_types: List of job types to query for
+            timeout: Maximum number of seconds the worker should wait
+            
+        Returns:
+            List of available jobs (empty if none became available before the
+            timeout), or None if the worker does not support long polling
+        """
+        url = f"{self.worker_url}/api/runner/jobs/poll"
+        params = {'types[]': job_types, 'timeout': timeout}
+        
+        response = self.session.get(url, params=params, headers=self._headers(), timeout=timeout + 5)
+        
+        if self._endpoint_missing(response):
+            # Older worker without the long poll endpoint
+            return None
+        
         response.raise_for_status()
         
+        if response.status_code == 204:
+            return []
+        
         result = response.json()
         return result.get('jobs', [])
 
+    def poll_and_claim(self, job_types: List[str]) -> Optional[Dict[str, Any]]:
+        """Claim the next available job matching the specified types in one request.
+        
+        Args:
+            job_types: List of job types to query for
+            
+        Returns:
+            Job details if a job was claimed, an empty dict if no job was
+            available, or None if the worker does not support poll-and-claim
+        """
+        url = f"{self.worker_url}/api/runner/jobs/poll-and-claim"
+        data = {'types': job_types}
+        
+        response = self.session.post(url, json=data, headers=self._headers())
+        
+        if self._endpoint_missing(response):
+            # Older worker without the poll-and-claim endpoint
+            return None
+        
+        response.raise_for_status()
+        
+        if response.status_code == 204:
+            return {}
+        
+        result = response.json()
+        job = result.get('job') or {}
+        if job:
+            logger.info(f"Successfully claimed job {job['job_id']}")
+        return job
+
     def claim_job(self, job_id: str) -> Optional[Dict[str, Any]]:
         """Claim a job for execution.
         
@@ -137,7 +234,13 @@ class RunpackClient:
         
         logger.info(f"Claiming job {job_id}")
         
-        response = requests.post(url, headers=self._headers())
+        response = self.session.post(url, headers=self._headers())
+        
+        if response.status_code == 409:
+            # Another runner claimed the job first
+            logger.info(f"Failed to claim job {job_id}: {response.json().get('message')}")
+            return None
+        
         response.raise_for_status()
         
         result = response.json()
@@ -148,12 +251,78 @@ class RunpackClient:
             logger.warning(f"Failed to claim job {job_id}: {result.get('message')}")
             return None
 
+    def claim_any(self, job_ids: List[str]) -> Optional[Dict[str, Any]]:
+        """Claim the first available job out of a list of candidates.
+        
+        The worker picks and claims the job atomically, so only one request
+        is needed no matter how many candidates other runners have taken.
+        
+        Args:
+            job_ids: IDs of the candidate jobs, at most 50
+            
+        Returns:
+            Job details if a job was successfully claimed, an empty dict if
+            none of the jobs could be claimed, or None if the worker does not
+            support claiming one of several jobs
+        """
+        url = f"{self.worker_url}/api/runner/jobs/claim"
+        data = {'job_ids': job_ids}
+        
+        logger.info(f"Claiming one of {len(job_ids)} jobs")
+        
+        response = self.session.post(url, json=data, headers=self._headers())
+        
+        if self._endpoint_missing(response):
+            # Older worker without the claim-any endpoint
+            return None
+        
+        if response.status_code == 409:
+            logger.info(f"Failed to claim any job: {response.json().get('message')}")
+            return {}
+        
+        response.raise_for_status()
+        
+        result = response.json()
+        job = result.get('job')
+        if result.get('success') and job:
+            logger.info(f"Successfully claimed job {job['job_id']}")
+            return job
+        else:
+            logger.warning(f"Failed to claim any job: {result.get('message')}")
+            return {}
+
+    def release_job(self, job_id: str) -> bool:
+        """Return a claimed job that hasn't been started to the queue.
+        
+        Args:
+            job_id: ID of the job to release
+            
+        Returns:
+            True if the job was released, False if the worker could not
+            release it (e.g. an older worker without the release endpoint)
+        """
+        url = f"{self.worker_url}/api/runner/jobs/{job_id}/release"
+        
+        logger.info(f"Releasing job {job_id}")
+        
+        response = self.session.post(url, headers=self._headers())
+        
+        if response.status_code in (404, 409, 501):
+            logger.warning(f"Failed to release job {job_id}: HTTP {response.status_code}")
+            return False
+        
+        response.raise_for_status()
+        
+        result = response.json()
+        return result.get('success', False)
+
     def send_heartbeat(
         self,
         job_id: str,
         progress_current: int,
         progress_total: int,
-        console_output: str
+        console_output: str,
+        console_append: bool = False
     ) -> bool:
         """Send a heartbeat for a job in progress.
         
@@ -161,7 +330,12 @@ class RunpackClient:
             job_id: ID of the job
             progress_current: Current progress value
             progress_total: Total progress value
-            console_output: Console output to append
+            console_output: Console output (full output, or only the new part
+                            if console_append is True)
+            console_append: Append console_output to the stored console output
+                            instead of replacing it. Only use this once
+                            console_append_supported is True, since older
+                            workers ignore it and overwrite the output.
             
         Returns:
             True if heartbeat was successful
@@ -170,13 +344,23 @@ class RunpackClient:
         data = {
             'progress_current': progress_current,
             'progress_total': progress_total,
-            'console_output': console_output
+            'console_output': console_output,
+            'console_append': console_append
         }
         
-        response = requests.post(url, json=data, headers=self._headers())
+        headers = self._headers()
+        payload = json.dumps(data).encode('utf-8')
+        # Older workers parse the body as plain JSON, so only compress once
+        # the worker has confirmed support
+        if self.console_append_supported and len(payload) > GZIP_MIN_SIZE:
+            payload = gzip.compress(payload, compresslevel=1)
+            headers['Content-Encoding'] = 'gzip'
+        
+        response = self.session.post(url, data=payload, headers=headers, timeout=HEARTBEAT_TIMEOUT)
         response.raise_for_status()
         
         result = response.json()
+        self.console_append_supported = result.get('console_append_supported', False)
         return result.get('success', False)
 
     def complete_job(
@@ -203,7 +387,7 @@ class RunpackClient:
         
         logger.info(f"Completing job {job_id}")
         
-        response = requests.post(url, json=data, headers=self._headers())
+        response = self.session.post(url, json=data, headers=self._headers())
         response.raise_for_status()
         
         result = response.json()
@@ -240,7 +424,7 @@ class RunpackClient:
         
         logger.info(f"Reporting error for job {job_id}: {error_message}")
         
-        response = requests.post(url, json=data, headers=self._headers())
+        response = self.session.post(url, json=data, headers=self._headers())
         response.raise_for_status()
         
         result = response.json()
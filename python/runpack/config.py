@@ -3,6 +3,7 @@
 import json
 import os
 import socket
+import time
 import uuid
 from pathlib import Path
 from typing import Optional
@@ -19,7 +20,15 @@ POLL_INTERVAL_INCREMENT = 2  # seconds - increase per empty poll
 # Legacy constant for compatibility
 POLL_INTERVAL = MIN_POLL_INTERVAL  # seconds
 
+# Long polling - the worker holds the request open until a job is available
+LONG_POLL_TIMEOUT = 50  # seconds
+
 HEARTBEAT_INTERVAL = 30  # seconds
+# How long to wait for the last heartbeat to be sent when a job finishes
+HEARTBEAT_STOP_TIMEOUT = 15  # seconds
+# How long a successful runner verification is trusted before verifying again
+VERIFICATION_TTL = 60 * 60  # seconds
+
 CONFIG_FILE = ".runpack_runner.json"
 LOG_FILE = "runpack_runner.log"
 
@@ -36,6 +45,7 @@ class RunnerConfig:
         self.config_file = Path(config_file)
         self.runner_id: Optional[str] = None
         self.runner_name: Optional[str] = None
+        self.verified_until: Optional[float] = None
 
     def load(self) -> bool:
         """Load configuration from file if it exists.
@@ -51,6 +61,11 @@ class RunnerConfig:
                 data = json.load(f)
                 self.runner_id = data.get('runner_id')
                 self.runner_name = data.get('runner_name')
+                verified_until = data.get('verified_until')
+                # Ignore a hand-edited or corrupted timestamp and verify again
+                if isinstance(verified_until, bool) or not isinstance(verified_until, (int, float)):
+                    verified_until = None
+                self.verified_until = verified_until
                 return True
         except (json.JSONDecodeError, IOError) as e:
             # If config file is corrupted, we'll create a new one
@@ -60,7 +75,8 @@ class RunnerConfig:
         """Save configuration to file."""
         data = {
             'runner_id': self.runner_id,
-            'runner_name': self.runner_name
+            'runner_name': self.runner_name,
+            'verified_until': self.verified_until
         }
         with open(self.config_file, 'w') as f:
             json.dump(data, f, indent=2)
@@ -84,4 +100,26 @@ class RunnerConfig:
         """
         self.runner_id = runner_id
         self.runner_name = runner_name
+        self.verified_until = time.time() + VERIFICATION_TTL
+        self.save()
+
+    def is_verification_fresh(self, margin: float = 60) -> bool:
+        """Check whether the last successful verification is still trusted.
+        
+        Args:
+            margin: Seconds of remaining validity required
+            
+        Returns:
+            True if the runner was verified recently enough to skip verification
+        """
+        return self.verified_until is not None and self.verified_until > time.time() + margin
+
+    def mark_verified(self) -> None:
+        """Record a successful verification and save to file."""
+        self.verified_until = time.time() + VERIFICATION_TTL
+        self.save()
+
+    def invalidate_verification(self) -> None:
+        """Forget the last successful verification and save to file."""
+        self.verified_until = None
         self.save()
@@ -1,10 +1,12 @@
 """Base class for job handlers."""
 
+from typing import Tuple
+
 
 class JobHandler:
     """Base class for job handlers."""
     
-    def execute(self, input_params: dict, heartbeat_callback) -> dict:
+    def execute(self, input_params: dict, heartbeat_callback) -> Tuple[dict, str]:
         """Execute the job.
         
         Args:
@@ -13,7 +15,7 @@ class JobHandler:
                                Signature: heartbeat_callback(progress_current, progress_total, console_output)
             
         Returns:
-            Job result as a dictionary
+            Tuple of (job result as a dictionary, final console output)
             
         Raises:
             ValueError: If input parameters are invalid
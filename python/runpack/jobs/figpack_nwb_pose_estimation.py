@@ -1,18 +1,222 @@
 """Figpack NWB Pose Estimation job handler for pose tracking data visualization."""
 
+import collections
+import concurrent.futures
+import functools
+import hashlib
+import os
+import queue
+import tempfile
 import threading
 import json
+import logging
 import time
-from datetime import datetime
-from typing import Any, Callable, Dict
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
 
+import requests
+
+from ..config import HEARTBEAT_INTERVAL
 from .base import JobHandler
 
 
+logger = logging.getLogger(__name__)
+
+# figpack_nwb pulls in pynwb/h5py/numpy, so import it once per runner process.
+# Any failure (not just ImportError, e.g. a numpy ABI mismatch) is kept and
+# raised when a pose estimation job runs, so other job types still work.
+try:
+    import figpack_nwb.views as fpn
+    _fpn_import_error = None
+except Exception as e:
+    fpn = None
+    _fpn_import_error = e
+
+# Use orjson for faster JSON encoding when it is installed
+try:
+    import orjson
+
+    def _dumps(obj: Any) -> str:
+        return orjson.dumps(obj).decode('utf-8')
+except ImportError:
+    _dumps = json.dumps
+
+
+# Console line template, bound once instead of building an f-string per line
+_LOG_FMT = "[%s] %s".__mod__
+
+# Heartbeats are sent more often for a few ticks right after a phase change
+PHASE_CHANGE_HEARTBEAT_INTERVAL = 5  # seconds
+PHASE_CHANGE_HEARTBEAT_TICKS = 3
+
+# Shortest heartbeat_interval a job may request, keeping heartbeats well under
+# the worker's per-runner rate limit
+MIN_HEARTBEAT_INTERVAL = 1  # seconds
+
+# While the NWB file is loading, log a progress line this often
+LOAD_PROGRESS_INTERVAL = 10  # seconds
+
+# Only the most recent console lines are kept for long-running jobs
+MAX_CONSOLE_LINES = 2000
+
+# Set RUNPACK_DISABLE_VIEW_CACHE=1 to rebuild the view for every job
+DISABLE_VIEW_CACHE = os.getenv("RUNPACK_DISABLE_VIEW_CACHE", "") not in ("", "0")
+VIEW_CACHE_SIZE = 8
+
+_view_cache_lock = threading.Lock()
+
+# Set RUNPACK_PREFETCH_NWB_MAX_MB to download NWB files up to that size with
+# concurrent range requests before loading them (disabled by default)
+try:
+    PREFETCH_MAX_BYTES = int(os.getenv("RUNPACK_PREFETCH_NWB_MAX_MB", "0")) * 1024 * 1024
+except ValueError:
+    logger.warning(
+        f"Ignoring invalid RUNPACK_PREFETCH_NWB_MAX_MB={os.getenv('RUNPACK_PREFETCH_NWB_MAX_MB')!r}; "
+        f"expected a whole number of megabytes"
+    )
+    PREFETCH_MAX_BYTES = 0
+PREFETCH_CHUNK_SIZE = 8 * 1024 * 1024  # bytes
+PREFETCH_CONCURRENCY = 8
+PREFETCH_DIR = Path(tempfile.gettempdir()) / "runpack_nwb_cache"
+# Least recently used files are removed once the cache grows past this size
+PREFETCH_CACHE_MAX_BYTES = 4 * PREFETCH_MAX_BYTES
+# Part files untouched for this long were left by a runner that died mid-download
+PREFETCH_STALE_PART_AGE = 60 * 60  # seconds
+
+
+def _evict_prefetch_cache(keep: Path) -> None:
+    """Remove the least recently used cached NWB files until the cache fits.
+    
+    Also removes stale part files left by interrupted downloads.
+    
+    Args:
+        keep: File that was just cached and must not be removed
+    """
+    stale_before = time.time() - PREFETCH_STALE_PART_AGE
+    for path in PREFETCH_DIR.glob('*.part'):
+        try:
+            if path.stat().st_mtime < stale_before:
+                path.unlink(missing_ok=True)
+        except FileNotFoundError:
+            continue
+    
+    files = []
+    for path in PREFETCH_DIR.glob('*.nwb'):
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue
+        files.append((stat.st_mtime, stat.st_size, path))
+    
+    total = sum(size for _, size, _ in files)
+    for _, size, path in sorted(files):
+        if total <= PREFETCH_CACHE_MAX_BYTES:
+            break
+        if path == keep:
+            continue
+        path.unlink(missing_ok=True)
+        total -= size
+
+
+def prefetch_nwb_file(nwb_url: str, max_bytes: int) -> Optional[str]:
+    """Download an NWB file to a local cache using concurrent range requests.
+    
+    Args:
+        nwb_url: URL to the NWB file
+        max_bytes: Largest file size to prefetch
+        
+    Returns:
+        Path to the local copy, or None if the file is too large or the
+        server does not support range requests
+    """
+    with requests.Session() as session:
+        # Ask for the raw bytes so Content-Length and ranges are file offsets
+        session.headers['Accept-Encoding'] = 'identity'
+        
+        response = session.head(nwb_url, allow_redirects=True, timeout=30)
+        response.raise_for_status()
+        
+        size = int(response.headers.get('Content-Length', 0))
+        if size == 0 or size > max_bytes or response.headers.get('Accept-Ranges') != 'bytes':
+            return None
+        
+        local_path = PREFETCH_DIR / (hashlib.sha1(nwb_url.encode('utf-8')).hexdigest() + '.nwb')
+        if local_path.exists() and local_path.stat().st_size == size:
+            # Mark as recently used so eviction keeps it
+            os.utime(local_path)
+            return str(local_path)
+        
+        PREFETCH_DIR.mkdir(parents=True, exist_ok=True)
+        # Unique part file so concurrent downloads of the same URL don't collide
+        fd, part_name = tempfile.mkstemp(dir=PREFETCH_DIR, suffix='.part')
+        part_path = Path(part_name)
+        with os.fdopen(fd, 'wb') as f:
+            f.truncate(size)
+        
+        # Range requests go to the final URL so redirects are only followed once
+        data_url = response.url
+        
+        def fetch_chunk(start: int) -> None:
+            end = min(start + PREFETCH_CHUNK_SIZE, size) - 1
+            r = session.get(data_url, headers={'Range': f'bytes={start}-{end}'}, timeout=60)
+            r.raise_for_status()
+            if r.status_code != 206:
+                raise ValueError(f"Server ignored range request (status {r.status_code})")
+            # The file is pre-sized, so a short or shifted chunk would leave a
+            # corrupt copy that later passes the size check
+            content_range = r.headers.get('Content-Range')
+            if content_range != f'bytes {start}-{end}/{size}':
+                raise ValueError(f"Unexpected Content-Range {content_range!r} for bytes {start}-{end}/{size}")
+            if len(r.content) != end - start + 1:
+                raise ValueError(f"Expected {end - start + 1} bytes for range {start}-{end}, got {len(r.content)}")
+            with open(part_path, 'r+b') as f:
+                f.seek(start)
+                f.write(r.content)
+        
+        try:
+            with concurrent.futures.ThreadPoolExecutor(max_workers=PREFETCH_CONCURRENCY) as executor:
+                list(executor.map(fetch_chunk, range(0, size, PREFETCH_CHUNK_SIZE)))
+            os.replace(part_path, local_path)
+        except Exception:
+            part_path.unlink(missing_ok=True)
+            raise
+    
+    _evict_prefetch_cache(keep=local_path)
+    return str(local_path)
+
+
+def _build_view(nwb_url: str, path: str):
+    """Build a PoseEstimation view from an NWB file."""
+    return fpn.PoseEstimation(
+        nwb=nwb_url,
+        path=path,
+        use_local_cache=True
+    )
+
+
+_cached_build_view = functools.lru_cache(maxsize=VIEW_CACHE_SIZE)(_build_view)
+
+
+def get_pose_estimation_view(nwb_url: str, path: str):
+    """Get a PoseEstimation view, reusing a cached one for repeated (nwb_url, path) pairs.
+    
+    Args:
+        nwb_url: URL to the NWB file
+        path: Path to pose estimation data in NWB file
+        
+    Returns:
+        PoseEstimation view
+    """
+    if DISABLE_VIEW_CACHE:
+        return _build_view(nwb_url, path)
+    with _view_cache_lock:
+        return _cached_build_view(nwb_url, path)
+
+
 class FigpackNwbPoseEstimationJob(JobHandler):
     """Generate a pose estimation visualization from NWB pose tracking data and upload to figurl."""
     
-    def execute(self, input_params: Dict[str, Any], heartbeat_callback: Callable) -> Dict[str, Any]:
+    def execute(self, input_params: Dict[str, Any], heartbeat_callback: Callable) -> Tuple[Dict[str, Any], str]:
         """Execute the figpack NWB pose estimation job.
         
         Args:
@@ -20,10 +224,12 @@ class FigpackNwbPoseEstimationJob(JobHandler):
                 - 'nwb_url' (str): URL to the NWB file
                 - 'path' (str): Path to pose estimation data in NWB file 
                   (e.g., '/processing/behavior/PoseEstimationLeftCamera')
+                Optional:
+                - 'heartbeat_interval' (int/float): Seconds between heartbeats, 1-60 (default 30)
             heartbeat_callback: Function to send heartbeats
             
         Returns:
-            Dictionary with the figurl URL for the pose estimation visualization
+            Tuple of (dictionary with the figurl URL for the pose estimation visualization, final console output)
             
         Raises:
             ValueError: If required parameters are missing or invalid
@@ -41,6 +247,7 @@ class FigpackNwbPoseEstimationJob(JobHandler):
         
         nwb_url = input_params['nwb_url']
         path = input_params['path']
+        heartbeat_interval = input_params.get('heartbeat_interval', HEARTBEAT_INTERVAL)
         
         # Validate parameter types
         if not isinstance(nwb_url, str):
@@ -49,6 +256,15 @@ class FigpackNwbPoseEstimationJob(JobHandler):
         if not isinstance(path, str):
             raise ValueError(f"Parameter 'path' must be a string, got {type(path).__name__}")
         
+        if isinstance(heartbeat_interval, bool) or not isinstance(heartbeat_interval, (int, float)):
+            raise ValueError(f"Parameter 'heartbeat_interval' must be a number, got {type(heartbeat_interval).__name__}")
+        
+        if not MIN_HEARTBEAT_INTERVAL <= heartbeat_interval <= 60:
+            raise ValueError(
+                f"Parameter 'heartbeat_interval' must be between {MIN_HEARTBEAT_INTERVAL} and 60 seconds, "
+                f"got {heartbeat_interval}"
+            )
+        
         # Validate URL format
         if not nwb_url.startswith(('http://', 'https://')):
             raise ValueError(f"Parameter 'nwb_url' must be a valid HTTP/HTTPS URL, got: {nwb_url}")
@@ -57,82 +273,169 @@ class FigpackNwbPoseEstimationJob(JobHandler):
         if not path.startswith('/'):
             raise ValueError(f"Parameter 'path' must start with '/', got: {path}")
         
-        # Build console output with timestamps
-        console_lines = []
-        console_lock = threading.Lock()
+        # Build console output with timestamps. log() only enqueues lines; a
+        # dedicated console thread owns a bounded line buffer and only joins it
+        # into a snapshot when a heartbeat or the final flush asks for one.
+        log_queue: queue.SimpleQueue = queue.SimpleQueue()
+        console_snapshot = ''
+        phase = 'setup'
+        phase_started = time.monotonic()
+        # Set to wake the heartbeat thread early (phase change or stop)
+        wake_heartbeat = threading.Event()
         
         def log(message: str):
             """Add a timestamped log message (thread-safe)."""
-            timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            line = f"[{timestamp}] {message}"
-            with console_lock:
-                console_lines.append(line)
+            log_queue.put(_LOG_FMT((time.strftime('%Y-%m-%d %H:%M:%S'), message)))
         
-        # Import required libraries
-        log("Importing required libraries...")
-        try:
-            import figpack_nwb.views as fpn
-        except ImportError as e:
-            raise ImportError(f"Failed to import required libraries. Please install figpack_nwb: {e}")
+        def set_phase(name: str):
+            """Start a new job phase."""
+            nonlocal phase, phase_started
+            phase = name
+            phase_started = time.monotonic()
+            wake_heartbeat.set()
+        
+        def phase_elapsed() -> float:
+            """Seconds spent in the current phase (monotonic clock)."""
+            return time.monotonic() - phase_started
+        
+        def console_worker():
+            """Worker function that drains the log queue into the console buffer.
+            
+            Queue items are log lines, a reply queue requesting a snapshot, or
+            None to publish the final snapshot and stop.
+            """
+            nonlocal console_snapshot
+            console_lines = collections.deque(maxlen=MAX_CONSOLE_LINES)
+            dropped = 0
+            dirty = False
+            while True:
+                item = log_queue.get()
+                if isinstance(item, str):
+                    if len(console_lines) == MAX_CONSOLE_LINES:
+                        dropped += 1
+                    console_lines.append(item)
+                    dirty = True
+                    continue
+                if dirty:
+                    if dropped:
+                        console_snapshot = f"[... {dropped} earlier lines truncated ...]\n" + '\n'.join(console_lines)
+                    else:
+                        console_snapshot = '\n'.join(console_lines)
+                    dirty = False
+                if item is None:
+                    return
+                item.put(console_snapshot)
+        
+        def get_console_output() -> str:
+            """Get a snapshot of the console output logged so far."""
+            reply: queue.SimpleQueue = queue.SimpleQueue()
+            log_queue.put(reply)
+            try:
+                return reply.get(timeout=5)
+            except queue.Empty:
+                # Console thread already stopped
+                return console_snapshot
+        
+        # Check required libraries
+        if fpn is None:
+            if isinstance(_fpn_import_error, ImportError):
+                raise ImportError(f"Failed to import required libraries. Please install figpack_nwb: {_fpn_import_error}")
+            raise RuntimeError(f"Failed to import figpack_nwb: {_fpn_import_error}") from _fpn_import_error
+        
+        # Figure description is constant for the job, so encode it up front
+        description = _dumps({
+            'dandiset_id': dandiset_id,
+            'neurosift_url': neurosift_url,
+            'nwb_url': nwb_url,
+            'path': path,
+        })
+        
+        def load_view():
+            """Load the PoseEstimation view, from a prefetched local copy if enabled."""
+            nwb_source = nwb_url
+            if PREFETCH_MAX_BYTES > 0:
+                try:
+                    local_path = prefetch_nwb_file(nwb_url, PREFETCH_MAX_BYTES)
+                except Exception as e:
+                    log(f"Failed to prefetch NWB file, reading it remotely: {str(e)}")
+                    local_path = None
+                if local_path:
+                    log(f"Prefetched NWB file to: {local_path}")
+                    nwb_source = local_path
+            return get_pose_estimation_view(nwb_source, path)
         
         # Setup heartbeat thread
         stop_heartbeat = threading.Event()
-        heartbeat_interval = 30  # seconds
         
         def heartbeat_worker():
             """Worker function that sends periodic heartbeats."""
+            last_phase = None
+            unchanged_ticks = 0
             while not stop_heartbeat.is_set():
-                with console_lock:
-                    current_console = '\n'.join(console_lines)
-                
+                wake_heartbeat.clear()
                 heartbeat_callback(
                     progress_current=None,  # Unknown progress for blocking operations
                     progress_total=None,
-                    console_output=current_console
+                    console_output=get_console_output()
                 )
                 
-                # Wait for the next interval or until stopped
-                stop_heartbeat.wait(timeout=heartbeat_interval)
+                # Heartbeat faster for a few ticks after a phase change, then
+                # back off to the regular interval while the phase is unchanged
+                if phase != last_phase:
+                    last_phase = phase
+                    unchanged_ticks = 0
+                else:
+                    unchanged_ticks += 1
+                if unchanged_ticks < PHASE_CHANGE_HEARTBEAT_TICKS:
+                    timeout = min(heartbeat_interval, PHASE_CHANGE_HEARTBEAT_INTERVAL)
+                else:
+                    timeout = heartbeat_interval
+                
+                # Wait for the next interval, a phase change or stop
+                wake_heartbeat.wait(timeout=timeout)
         
-        # Start heartbeat thread
+        # Start console and heartbeat threads
+        console_thread = threading.Thread(target=console_worker, daemon=True)
+        console_thread.start()
         log("Starting heartbeat thread...")
         heartbeat_thread = threading.Thread(target=heartbeat_worker, daemon=True)
         heartbeat_thread.start()
         
         try:
             # Create pose estimation view from NWB file
+            set_phase('loading')
             log(f"Loading NWB file from: {nwb_url}")
             log(f"Pose estimation path: {path}")
             log("This may take several minutes for large files...")
             
             try:
-                view = fpn.PoseEstimation(
-                    nwb=nwb_url,
-                    path=path,
-                    use_local_cache=True
-                )
-                log("Successfully created PoseEstimation view")
+                # Load in a worker thread so progress can be logged while it blocks
+                with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
+                    future = executor.submit(load_view)
+                    while True:
+                        try:
+                            view = future.result(timeout=LOAD_PROGRESS_INTERVAL)
+                            break
+                        except concurrent.futures.TimeoutError:
+                            log(f"Still loading NWB file ({int(phase_elapsed())}s elapsed)...")
+                log(f"Successfully created PoseEstimation view in {phase_elapsed():.1f}s")
             except Exception as e:
                 log(f"Failed to create PoseEstimation view: {str(e)}")
                 raise Exception(f"Failed to create PoseEstimation view from NWB file: {e}")
             
             # Upload and get URL
+            set_phase('uploading')
             log("Uploading pose estimation to figurl...")
             log("This may take several minutes depending on data size...")
             
             try:
                 url = view.show(
                     title='RUNPACK: Pose Estimation from NWB',
-                    description=json.dumps({
-                        'dandiset_id': dandiset_id,
-                        'neurosift_url': neurosift_url,
-                        'nwb_url': nwb_url,
-                        'path': path,
-                    }),
+                    description=description,
                     upload=True,
                     wait_for_input=False
                 )
-                log(f"Successfully uploaded! URL: {url}")
+                log(f"Successfully uploaded in {phase_elapsed():.1f}s. URL: {url}")
             except Exception as e:
                 log(f"Failed to upload: {str(e)}")
                 raise Exception(f"Failed to upload pose estimation to figurl: {e}")
@@ -144,10 +447,15 @@ class FigpackNwbPoseEstimationJob(JobHandler):
             # Stop heartbeat thread
             log("Stopping heartbeat thread...")
             stop_heartbeat.set()
+            wake_heartbeat.set()
             heartbeat_thread.join(timeout=5)
+            
+            # Flush remaining log lines and stop console thread
+            log_queue.put(None)
+            console_thread.join()
         
         # Send final heartbeat with complete console output
-        final_console = '\n'.join(console_lines)
+        final_console = console_snapshot
         heartbeat_callback(
             progress_current=100,
             progress_total=100,
@@ -161,5 +469,4 @@ class FigpackNwbPoseEstimationJob(JobHandler):
             'dandiset_id': dandiset_id,
             'neurosift_url': neurosift_url,
             'path': path,
-            'console_output': final_console
-        }
+        }, final_console
@@ -3,7 +3,7 @@
 import threading
 import json
 from datetime import datetime
-from typing import Any, Callable, Dict
+from typing import Any, Callable, Dict, Tuple
 
 from .base import JobHandler
 
@@ -11,7 +11,7 @@ from .base import JobHandler
 class FigpackNwbRasterPlotJob(JobHandler):
     """Generate a raster plot from NWB units table and upload to figurl."""
     
-    def execute(self, input_params: Dict[str, Any], heartbeat_callback: Callable) -> Dict[str, Any]:
+    def execute(self, input_params: Dict[str, Any], heartbeat_callback: Callable) -> Tuple[Dict[str, Any], str]:
         """Execute the figpack NWB raster plot job.
         
         Args:
@@ -21,7 +21,7 @@ class FigpackNwbRasterPlotJob(JobHandler):
             heartbeat_callback: Function to send heartbeats
             
         Returns:
-            Dictionary with the figurl URL for the raster plot
+            Tuple of (dictionary with the figurl URL for the raster plot, final console output)
             
         Raises:
             ValueError: If required parameters are missing or invalid
@@ -159,5 +159,4 @@ class FigpackNwbRasterPlotJob(JobHandler):
             'dandiset_id': dandiset_id,
             'neurosift_url': neurosift_url,
             'units_path': units_path,
-            'console_output': final_console
-        }
+        }, final_console
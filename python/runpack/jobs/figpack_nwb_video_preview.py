@@ -4,7 +4,7 @@ import threading
 import json
 import h5py
 from datetime import datetime
-from typing import Any, Callable, Dict
+from typing import Any, Callable, Dict, Tuple
 
 import numpy as np
 
@@ -14,7 +14,7 @@ from .base import JobHandler
 class FigpackNwbVideoPreviewJob(JobHandler):
     """Generate a video preview from NWB ImageSeries and upload to figurl."""
     
-    def execute(self, input_params: Dict[str, Any], heartbeat_callback: Callable) -> Dict[str, Any]:
+    def execute(self, input_params: Dict[str, Any], heartbeat_callback: Callable) -> Tuple[Dict[str, Any], str]:
         """Execute the figpack NWB video preview job.
         
         Args:
@@ -24,7 +24,7 @@ class FigpackNwbVideoPreviewJob(JobHandler):
             heartbeat_callback: Function to send heartbeats
             
         Returns:
-            Dictionary with the figurl URL for the video preview
+            Tuple of (dictionary with the figurl URL for the video preview, final console output)
             
         Raises:
             ValueError: If required parameters are missing or invalid
@@ -241,7 +241,7 @@ class FigpackNwbVideoPreviewJob(JobHandler):
             'neurosift_url': neurosift_url,
             'image_series_path': image_series_path,
             'num_frames': num_frames
-        }
+        }, final_console
 
 
 def _get_starting_time_and_rate(X: h5py.Group):
@@ -2,7 +2,7 @@
 
 import time
 from datetime import datetime
-from typing import Any, Callable, Dict
+from typing import Any, Callable, Dict, Tuple
 
 from .base import JobHandler
 
@@ -10,7 +10,7 @@ from .base import JobHandler
 class HelloWorldJob(JobHandler):
     """Simple hello world job that simulates processing time."""
     
-    def execute(self, input_params: Dict[str, Any], heartbeat_callback: Callable) -> Dict[str, Any]:
+    def execute(self, input_params: Dict[str, Any], heartbeat_callback: Callable) -> Tuple[Dict[str, Any], str]:
         """Execute the hello world job.
         
         Args:
@@ -18,7 +18,7 @@ class HelloWorldJob(JobHandler):
             heartbeat_callback: Function to send heartbeats
             
         Returns:
-            Dictionary with greeting message and processing time
+            Tuple of (dictionary with greeting message and processing time, final console output)
             
         Raises:
             ValueError: If required parameters are missing or invalid
@@ -113,5 +113,4 @@ class HelloWorldJob(JobHandler):
         return {
             'message': f"Hello, {name}!",
             'processing_time': processing_time,
-            'console_output': final_console
-        }
+        }, final_console
@@ -3,12 +3,15 @@
 import logging
 import os
 import signal
-import time
-from typing import Optional
+import threading
+from typing import List, Optional
+import requests
 from notifyrelay import NotifyRelayClient, Subscriber as NotifyRelaySubscriber
 
 from .client import RunpackClient
 from .config import (
+    HEARTBEAT_STOP_TIMEOUT,
+    LONG_POLL_TIMEOUT,
     MIN_POLL_INTERVAL,
     MAX_POLL_INTERVAL,
     POLL_INTERVAL_INCREMENT,
@@ -25,6 +28,119 @@ NOTIFY_RELAY_SUBSCRIBE_KEY = os.getenv("NOTIFY_RELAY_SUBSCRIBE_KEY", None)
 NOTIFY_RELAY_SUBSCRIBE_ID = os.getenv("NOTIFY_RELAY_SUBSCRIBE_ID", None)
 
 
+def _is_runner_not_found(response: requests.Response) -> bool:
+    """Check whether a response is the worker reporting an unregistered runner ID.
+    
+    A 403 can also come from a proxy or firewall in front of the worker, so
+    only the worker's own {"error": "Runner not found"} body counts.
+    """
+    if response.status_code != 403:
+        return False
+    try:
+        return response.json().get('error') == 'Runner not found'
+    except ValueError:
+        return False
+
+
+class _ShutdownRequested(Exception):
+    """Raised from the signal handler to abort a long poll in progress."""
+
+
+class _HeartbeatSender(threading.Thread):
+    """Background thread that sends job heartbeats to the worker.
+    
+    Handlers submit heartbeats without blocking on the network. Only the most
+    recent pending heartbeat is kept; older ones are dropped since each one
+    carries the full console output.
+    """
+    
+    def __init__(self, client: RunpackClient, job_id: str):
+        """Initialize the heartbeat sender.
+        
+        Args:
+            client: API client used to send heartbeats
+            job_id: ID of the job the heartbeats belong to
+        """
+        super().__init__(daemon=True)
+        self.client = client
+        self.job_id = job_id
+        self._cond = threading.Condition()
+        self._pending: Optional[tuple] = None
+        self._stopping = False
+        # Console output the worker has stored so far
+        self._console_sent = ''
+    
+    def submit(self, progress_current: int, progress_total: int, console_output: str) -> None:
+        """Queue a heartbeat, replacing any heartbeat that hasn't been sent yet.
+        
+        Does nothing once the sender is stopping.
+        """
+        with self._cond:
+            if self._stopping:
+                return
+            self._pending = (progress_current, progress_total, console_output)
+            self._cond.notify()
+    
+    def stop(self, timeout: float = HEARTBEAT_STOP_TIMEOUT) -> None:
+        """Send any pending heartbeat and stop the thread.
+        
+        Only the first call waits; later calls return immediately.
+        
+        Args:
+            timeout: Maximum number of seconds to wait for the pending heartbeat
+        """
+        with self._cond:
+            if self._stopping:
+                return
+            self._stopping = True
+            self._cond.notify()
+        if self.is_alive():
+            self.join(timeout)
+            if self.is_alive():
+                logger.warning(f"Heartbeat sender for job {self.job_id} did not stop within {timeout} seconds")
+    
+    def run(self) -> None:
+        """Send queued heartbeats until stopped."""
+        while True:
+            with self._cond:
+                while self._pending is None and not self._stopping:
+                    self._cond.wait()
+                item, self._pending = self._pending, None
+            if item is None:
+                # Stopping with nothing left to send
+                return
+            self._send(*item)
+    
+    def _send(self, progress_current: int, progress_total: int, console_output: str) -> None:
+        """Send a heartbeat, uploading only the console output the worker doesn't have yet."""
+        try:
+            # Resend everything unless the worker accepts appends and the output
+            # extends what was sent (a handler may truncate old lines from a
+            # bounded buffer)
+            sent_len = len(self._console_sent)
+            append = (
+                self.client.console_append_supported
+                and sent_len > 0
+                and console_output.startswith(self._console_sent)
+            )
+            success = self.client.send_heartbeat(
+                job_id=self.job_id,
+                progress_current=progress_current,
+                progress_total=progress_total,
+                console_output=console_output[sent_len:] if append else console_output,
+                console_append=append
+            )
+            if success:
+                self._console_sent = console_output
+            logger.debug(f"Sent heartbeat for job {self.job_id}: {progress_current}/{progress_total}")
+        except Exception as e:
+            # The worker may have applied the heartbeat before the error (e.g.
+            # a read timeout), so resend the full output next time rather
+            # than risk appending the same lines twice
+            self._console_sent = ''
+            logger.error(f"Failed to send heartbeat: {e}")
+
+
 class JobRunner:
     """Main job runner that polls for and executes jobs."""
     
@@ -38,8 +154,22 @@ class JobRunner:
         self.client = RunpackClient(WORKER_URL, api_key)
         self.config = RunnerConfig()
         self.running = True
+        self._shutdown_event = threading.Event()
         self.current_job_id: Optional[str] = None
         self.current_poll_interval = MIN_POLL_INTERVAL
+        self.long_poll = True
+        self.poll_and_claim_supported = True
+        self.claim_any_supported = True
+        self.poll_failed = False
+        # Set while waiting on a long poll, which is safe to abandon on shutdown
+        self._in_long_poll = False
+        # Error that stopped the main loop, raised once the runner has shut down
+        self._fatal_error: Optional[Exception] = None
+        
+        # Job handler registration is static, so resolve supported types and
+        # handler instances once (handlers keep no state between jobs)
+        self._job_types = tuple(get_supported_job_types())
+        self._handlers = {job_type: get_job_handler(job_type)() for job_type in self._job_types}
         
         # Setup signal handlers for graceful shutdown
         signal.signal(signal.SIGINT, self._signal_handler)
@@ -49,6 +179,29 @@ class JobRunner:
         """Handle shutdown signals gracefully."""
         logger.info(f"Received signal {signum}, shutting down gracefully...")
         self.running = False
+        self._shutdown_event.set()
+        if self._in_long_poll:
+            # Python retries interrupted socket reads (PEP 475), so abort the
+            # long poll explicitly rather than waiting for it to time out
+            raise _ShutdownRequested()
+    
+    def _not_registered_error(self) -> RuntimeError:
+        """Build the error reported when the worker no longer knows this runner."""
+        return RuntimeError(
+            f"Runner ID '{self.config.runner_id}' is not registered in the system.\n"
+            f"This can happen if the runner was deleted from the database.\n"
+            f"To fix this, delete the config file: {self.config.config_file}\n"
+            f"Then restart the runner to register with a new ID."
+        )
+    
+    def _stop_with_error(self, error: Exception) -> None:
+        """Stop the main loop because of an error that retrying can't fix.
+        
+        The error is raised from run() once the runner has shut down.
+        """
+        self._fatal_error = error
+        self.running = False
+        self._shutdown_event.set()
     
     def register(self) -> None:
         """Register the runner with the worker or load existing registration."""
@@ -58,17 +211,18 @@ class JobRunner:
             logger.info(f"Runner ID: {self.config.runner_id}")
             self.client.runner_id = self.config.runner_id
             
+            # Skip the verification round-trip if we verified recently
+            if self.config.is_verification_fresh():
+                logger.info("Runner registration was verified recently, skipping verification")
+                return
+            
             # Verify that the runner ID is still valid in the system
             logger.info("Verifying runner registration...")
             try:
                 is_valid = self.client.verify_runner()
                 if not is_valid:
-                    raise RuntimeError(
-                        f"Runner ID '{self.config.runner_id}' is not registered in the system.\n"
-                        f"This can happen if the runner was deleted from the database.\n"
-                        f"To fix this, delete the config file: {self.config.config_file}\n"
-                        f"Then restart the runner to register with a new ID."
-                    )
+                    raise self._not_registered_error()
+                self.config.mark_verified()
                 logger.info("Runner registration verified successfully")
             except Exception as e:
                 if isinstance(e, RuntimeError):
@@ -84,7 +238,7 @@ class JobRunner:
         else:
             # Generate new runner name and register
             runner_name = self.config.generate_name()
-            capabilities = get_supported_job_types()
+            capabilities = list(self._job_types)
             
             runner_id = self.client.register_runner(runner_name, capabilities)
             self.config.set_runner_info(runner_id, runner_name)
@@ -104,30 +258,27 @@ class JobRunner:
         self.current_job_id = job_id
         logger.info(f"Executing job {job_id} of type '{job_type}'")
         
+        # Heartbeats are sent from a background thread so handlers never block on the network
+        heartbeat_sender = _HeartbeatSender(self.client, job_id)
+        heartbeat_sender.start()
+        
         try:
             # Get the job handler
-            handler_class = get_job_handler(job_type)
-            handler = handler_class()
-            
-            # Create heartbeat callback
-            def send_heartbeat(progress_current: int, progress_total: int, console_output: str):
-                """Send heartbeat to worker."""
-                try:
-                    self.client.send_heartbeat(
-                        job_id=job_id,
-                        progress_current=progress_current,
-                        progress_total=progress_total,
-                        console_output=console_output
-                    )
-                    logger.debug(f"Sent heartbeat for job {job_id}: {progress_current}/{progress_total}")
-                except Exception as e:
-                    logger.error(f"Failed to send heartbeat: {e}")
+            handler = self._handlers.get(job_type)
+            if handler is None:
+                raise ValueError(f"Unsupported job type: {job_type}")
             
             # Execute the job
-            result = handler.execute(input_params, send_heartbeat)
+            ret = handler.execute(input_params, heartbeat_sender.submit)
+            if not (isinstance(ret, tuple) and len(ret) == 2):
+                raise TypeError(
+                    f"Handler for '{job_type}' returned {type(ret).__name__}; "
+                    f"expected a (result, console_output) tuple"
+                )
+            result, console_output = ret
             
-            # Extract console output from result if present
-            console_output = result.pop('console_output', '')
+            # Flush pending heartbeats before reporting completion
+            heartbeat_sender.stop()
             
             # Report successful completion
             self.client.complete_job(
@@ -161,47 +312,126 @@ class JobRunner:
             )
         
         finally:
+            heartbeat_sender.stop()
             self.current_job_id = None
 
+    def _wait_for_jobs(self) -> Optional[List[dict]]:
+        """Long poll the worker until jobs are available.
+        
+        Returns:
+            List of available jobs (empty on timeout or shutdown), or None if
+            the worker does not support long polling
+        """
+        try:
+            self._in_long_poll = True
+            if not self.running:
+                return []
+            return self.client.long_poll_jobs(self._job_types, timeout=LONG_POLL_TIMEOUT)
+        except _ShutdownRequested:
+            logger.info("Long poll interrupted by shutdown")
+            return []
+        finally:
+            self._in_long_poll = False
+    
+    def _claim_first(self, available_jobs: List[dict]) -> Optional[dict]:
+        """Claim the first of the available jobs that no other runner has taken.
+        
+        Args:
+            available_jobs: Candidate jobs, oldest first
+            
+        Returns:
+            Claimed job details, or None if no job was claimed
+        """
+        if self.claim_any_supported:
+            # Claim the first available job in a single request
+            claimed_job = self.client.claim_any([job['job_id'] for job in available_jobs])
+            if claimed_job is not None:
+                return claimed_job
+            logger.info("Worker does not support claiming one of several jobs - claiming jobs one at a time")
+            self.claim_any_supported = False
+        
+        for job in available_jobs:
+            claimed_job = self.client.claim_job(job['job_id'])
+            if claimed_job:
+                return claimed_job
+        return None
+    
+    def _claim_next_job(self) -> Optional[dict]:
+        """Poll for and claim the next available job.
+        
+        Returns:
+            Claimed job details, or None if no job was claimed
+        """
+        if self.long_poll:
+            # The long poll only reads job state, so it can be interrupted on
+            # shutdown without leaving a claimed job behind
+            available_jobs = self._wait_for_jobs()
+            if available_jobs is not None:
+                if not available_jobs:
+                    return None
+                return self._claim_first(available_jobs)
+            logger.info("Worker does not support long polling - falling back to interval polling")
+            self.long_poll = False
+        
+        if self.poll_and_claim_supported:
+            # Poll and claim in a single round-trip
+            claimed_job = self.client.poll_and_claim(self._job_types)
+            if claimed_job is not None:
+                return claimed_job
+            logger.info("Worker does not support poll-and-claim - falling back to separate poll and claim")
+            self.poll_and_claim_supported = False
+        
+        available_jobs = self.client.get_available_jobs(self._job_types)
+        if not available_jobs:
+            return None
+        
+        return self._claim_first(available_jobs)
+    
     def poll_and_execute(self) -> bool:
         """Poll for available jobs and execute them.
         
         Returns:
             True if a job was executed, False otherwise
         """
+        self.poll_failed = False
         try:
-            # Get supported job types
-            job_types = get_supported_job_types()
+            # Poll for and claim the next available job
+            claimed_job = self._claim_next_job()
             
-            # Poll for available jobs
-            available_jobs = self.client.get_available_jobs(job_types)
-
-            if not available_jobs:
+            if not claimed_job:
                 logger.debug("No jobs available")
                 return False
             
-            # Try to claim the first available job
-            for job in available_jobs:
-                job_id = job['job_id']
-                
-                claimed_job = self.client.claim_job(job_id)
-                
-                if claimed_job:
-                    # Successfully claimed, execute it
-                    self.execute_job(
-                        job_id=claimed_job['job_id'],
-                        job_type=claimed_job['job_type'],
-                        input_params=claimed_job['input_params']
-                    )
-                    return True  # Job was executed
-                else:
-                    logger.debug(f"Failed to claim job {job_id}, trying next one")
+            if not self.running:
+                # Shutdown was requested while the claim was in flight
+                job_id = claimed_job['job_id']
+                logger.info(f"Shutting down - releasing claimed job {job_id} without running it")
+                if not self.client.release_job(job_id):
+                    logger.warning(f"Could not release job {job_id}; it will fail once its heartbeat times out")
+                return False
             
-            # No jobs were successfully claimed
-            return False
+            self.execute_job(
+                job_id=claimed_job['job_id'],
+                job_type=claimed_job['job_type'],
+                input_params=claimed_job['input_params']
+            )
+            return True  # Job was executed
         
         except Exception as e:
-            logger.error(f"Error during polling: {e}", exc_info=True)
+            self.poll_failed = True
+            response = e.response if isinstance(e, requests.HTTPError) else None
+            status_code = response.status_code if response is not None else None
+            if response is not None and _is_runner_not_found(response):
+                # The worker no longer knows this runner ID, e.g. it was deleted
+                self.config.invalidate_verification()
+                self._stop_with_error(self._not_registered_error())
+            elif status_code == 401:
+                self._stop_with_error(RuntimeError(
+                    "Worker rejected the runner API key.\n"
+                    "Check that RUNPACK_RUNNER_API_KEY matches the worker's RUNNER_API_KEY."
+                ))
+            else:
+                logger.warning(f"Error during polling: {e}")
             return False
     
     def run(self) -> None:
@@ -238,6 +468,12 @@ class JobRunner:
             notify_relay_subscriber = None
             print('NotifyRelay not configured. The environment variable NOTIFY_RELAY_BASE_URL or NOTIFY_RELAY_SUBSCRIBE_KEY is missing.')
         
+        # NotifyRelay already pushes new job notifications, so only long poll without it
+        if notify_relay_subscriber is not None:
+            self.long_poll = False
+        else:
+            logger.info(f"Using long polling (timeout {LONG_POLL_TIMEOUT} seconds)")
+        
         while self.running:
             job_executed = False
             try:
@@ -246,13 +482,13 @@ class JobRunner:
                 # Adjust polling interval based on whether a job was executed
                 if job_executed:
                     # Job was executed - reset to minimum interval
-                    if notify_relay_subscriber is None:
+                    if notify_relay_subscriber is None and not self.long_poll:
                         if self.current_poll_interval != MIN_POLL_INTERVAL:
                             self.current_poll_interval = MIN_POLL_INTERVAL
                             logger.info(f"Job executed - resetting poll interval to {MIN_POLL_INTERVAL} seconds")
                 else:
                     # No job executed - increase interval (with max cap)
-                    if notify_relay_subscriber is None:
+                    if notify_relay_subscriber is None and not self.long_poll:
                         old_interval = self.current_poll_interval
                         self.current_poll_interval = min(
                             self.current_poll_interval + POLL_INTERVAL_INCREMENT,
@@ -267,15 +503,18 @@ class JobRunner:
             except Exception as e:
                 logger.error(f"Unexpected error in main loop: {e}", exc_info=True)
             
-            # Sleep before next poll, but check for shutdown frequently
-            if self.running and not job_executed:
-                # Sleep in 1-second intervals to allow for responsive shutdown
-                interval = self.current_poll_interval if notify_relay_subscriber is None else 300
-                for _ in range(interval):
-                    if not self.running:
-                        break
-                    new_job_notification = False
-                    if notify_relay_subscriber is not None:
+            # Sleep before next poll, but check for shutdown frequently. A long
+            # poll already waited on the worker, so only sleep after an error.
+            if self.running and not job_executed and (not self.long_poll or self.poll_failed):
+                if notify_relay_subscriber is None:
+                    # Single wait that returns early on shutdown
+                    self._shutdown_event.wait(timeout=self.current_poll_interval)
+                else:
+                    # Check for NotifyRelay messages every second
+                    for _ in range(300):
+                        if not self.running:
+                            break
+                        new_job_notification = False
                         messages = notify_relay_subscriber.get_messages()
                         for msg in messages:
                             message = msg['message']
@@ -283,9 +522,9 @@ class JobRunner:
                                 logger.info("Received new job notification via NotifyRelay")
                                 new_job_notification = True
                                 break
-                    if new_job_notification:
-                        break
-                    time.sleep(1)
+                        if new_job_notification:
+                            break
+                        self._shutdown_event.wait(timeout=1)
         
         # Shutdown
         if self.current_job_id:
@@ -297,6 +536,9 @@ class JobRunner:
             logger.info("NotifyRelay subscriber stopped")
 
         logger.info("Runner stopped")
+        
+        if self._fatal_error is not None:
+            raise self._fatal_error
 
 
 def run_runner(api_key: str) -> None:
@@ -14,6 +14,8 @@ export const SIZE_LIMITS = {
   OUTPUT_DATA: 500 * 1024, // 500 KB
   CONSOLE_OUTPUT: 1 * 1024 * 1024, // 1 MB
   ERROR_MESSAGE: 10 * 1024, // 10 KB
+  CLAIM_ANY_JOB_IDS: 50, // Max candidate job IDs per claim request
+  DECOMPRESSED_BODY: 8 * 1024 * 1024, // 8 MB (room for JSON escaping of a full console output)
 };
 
 // Timeouts
@@ -22,5 +24,14 @@ export const TIMEOUTS = {
   RUNNER_ACTIVE_THRESHOLD: 5 * 60 * 1000, // 5 minutes (runner considered inactive if no activity)
 };
 
+// Long polling for available jobs
+// Each waiting request runs one read-only query per CHECK_INTERVAL, so an idle
+// runner long polling with a 50 second timeout costs about 10 D1 reads per poll
+export const LONG_POLL = {
+  DEFAULT_WAIT: 30 * 1000, // 30 seconds
+  MAX_WAIT: 60 * 1000, // 60 seconds
+  CHECK_INTERVAL: 5 * 1000, // 5 seconds between database checks while waiting
+};
+
 // Rate limit window (in milliseconds)
 export const RATE_LIMIT_WINDOW = 60 * 1000; // 1 minute
@@ -1,5 +1,5 @@
 import { Env, Job, Runner, JobStatus } from '../types';
-import { TIMEOUTS } from '../config';
+import { SIZE_LIMITS, TIMEOUTS } from '../config';
 
 /**
  * Get a job by ID
@@ -92,6 +92,108 @@ export async function claimJob(
   return { success: true };
 }
 
+/**
+ * Claim the first pending job (oldest first) out of a list of candidates
+ */
+export async function claimAnyJob(
+  env: Env,
+  jobIds: string[],
+  runnerId: string
+): Promise<{ success: boolean; job?: Job; error?: string }> {
+  if (jobIds.length === 0) {
+    return { success: false, error: 'No job IDs provided' };
+  }
+
+  const now = Date.now();
+  const placeholders = jobIds.map(() => '?').join(',');
+
+  // Pick and claim in a single statement so concurrent runners can't claim the same job
+  const result = await env.DB.prepare(
+    `UPDATE jobs 
+     SET status = 'claimed', 
+         claimed_by = ?, 
+         claimed_at = ?, 
+         last_heartbeat = ?,
+         updated_at = ?
+     WHERE id = (
+       SELECT id FROM jobs
+       WHERE id IN (${placeholders}) AND status = 'pending'
+       ORDER BY created_at ASC
+       LIMIT 1
+     ) AND status = 'pending'
+     RETURNING *`
+  ).bind(runnerId, now, now, now, ...jobIds).first<Job>();
+
+  if (!result) {
+    return { success: false, error: 'All jobs already claimed or not found' };
+  }
+
+  return { success: true, job: result };
+}
+
+/**
+ * Claim the oldest pending job of the given types
+ */
+export async function claimNextJob(
+  env: Env,
+  jobTypes: string[],
+  runnerId: string
+): Promise<Job | null> {
+  if (jobTypes.length === 0) {
+    return null;
+  }
+
+  const now = Date.now();
+  const placeholders = jobTypes.map(() => '?').join(',');
+
+  // Pick and claim in a single statement so concurrent runners can't claim the same job
+  const result = await env.DB.prepare(
+    `UPDATE jobs 
+     SET status = 'claimed', 
+         claimed_by = ?, 
+         claimed_at = ?, 
+         last_heartbeat = ?,
+         updated_at = ?
+     WHERE id = (
+       SELECT id FROM jobs
+       WHERE status = 'pending' AND job_type IN (${placeholders})
+       ORDER BY created_at ASC
+       LIMIT 1
+     ) AND status = 'pending'
+     RETURNING *`
+  ).bind(runnerId, now, now, now, ...jobTypes).first<Job>();
+
+  return result;
+}
+
+/**
+ * Release a claimed job back to the queue before the runner starts it
+ */
+export async function releaseJob(
+  env: Env,
+  jobId: string,
+  runnerId: string
+): Promise<{ success: boolean; error?: string }> {
+  const now = Date.now();
+
+  // Only a job that is still claimed (not yet in progress) by this runner can be released
+  const result = await env.DB.prepare(
+    `UPDATE jobs 
+     SET status = 'pending', 
+         claimed_by = NULL, 
+         claimed_at = NULL, 
+         last_heartbeat = NULL,
+         updated_at = ?
+     WHERE id = ? AND claimed_by = ? AND status = 'claimed'`
+  ).bind(now, jobId, runnerId).run();
+
+  if (result.meta.changes === 0) {
+    return { success: false, error: 'Job not found or not claimed by this runner' };
+  }
+
+  return { success: true };
+}
+
 /**
  * Update job heartbeat and progress
  */
@@ -101,9 +203,15 @@ export async function updateJobHeartbeat(
   runnerId: string,
   progressCurrent: number,
   progressTotal: number,
-  consoleOutput: string
+  consoleOutput: string,
+  appendConsole: boolean = false
 ): Promise<{ success: boolean; error?: string }> {
   const now = Date.now();
+  // When appending, keep only the most recent output so the stored console
+  // output stays within the same limit as a full upload
+  const consoleExpr = appendConsole
+    ? `SUBSTR(COALESCE(console_output, '') || ?, -${SIZE_LIMITS.CONSOLE_OUTPUT})`
+    : '?';
 
   // Update heartbeat only if job is claimed/in_progress by this runner
   const result = await env.DB.prepare(
@@ -111,7 +219,7 @@ export async function updateJobHeartbeat(
      SET status = 'in_progress',
          progress_current = ?,
          progress_total = ?,
-         console_output = ?,
+         console_output = ${consoleExpr},
          last_heartbeat = ?,
          updated_at = ?
      WHERE id = ? AND claimed_by = ? AND status IN ('claimed', 'in_progress')`
@@ -233,12 +341,15 @@ export async function registerRunner(
 /**
  * Update runner last seen timestamp
  */
-export async function updateRunnerLastSeen(env: Env, runnerId: string): Promise<void> {
+export async function updateRunnerLastSeen(env: Env, runnerId: string): Promise<boolean> {
   const now = Date.now();
   
-  await env.DB.prepare(
+  const result = await env.DB.prepare(
     'UPDATE runners SET last_seen = ? WHERE id = ?'
   ).bind(now, runnerId).run();
+
+  // False if the runner is not registered (e.g. it was deleted)
+  return result.meta.changes > 0;
 }
 
 /**
@@ -1,16 +1,20 @@
 import {
+  claimAnyJob,
   claimJob,
+  claimNextJob,
   completeJob,
   failJob,
   getAvailableJobs,
   getJobById,
   getRunnerById,
   registerRunner,
+  releaseJob,
   updateJobHeartbeat,
   updateRunnerLastSeen,
 } from '../db/queries';
 import {
   AvailableJob,
+  ClaimAnyJobRequest,
   ClaimJobResponse,
   CompleteJobRequest,
   CompleteJobResponse,
@@ -19,12 +23,27 @@ import {
   ErrorJobResponse,
   HeartbeatRequest,
   HeartbeatResponse,
+  PollAndClaimJobRequest,
   RegisterRunnerRequest,
-  RegisterRunnerResponse
+  RegisterRunnerResponse,
+  ReleaseJobResponse
 } from '../types';
+import { LONG_POLL, SIZE_LIMITS } from '../config';
+import { BodyTooLargeError, readJsonBody } from '../utils/body';
 import { generateId } from '../utils/hash';
 import { validateConsoleOutput, validateErrorMessage, validateJobOutput } from '../utils/validation';
 
+/**
+ * Response for job requests from a runner ID that is not registered, so the
+ * runner can stop instead of claiming jobs under a deleted ID
+ */
+function runnerNotFoundResponse(): Response {
+  return new Response(JSON.stringify({ error: 'Runner not found' }), {
+    status: 403,
+    headers: { 'Content-Type': 'application/json' },
+  });
+}
+
 /**
  * Handle runner verification
  */
@@ -109,7 +128,9 @@ export async function handleRegisterRunner(request: Request, env: Env): Promise<
 export async function handleGetAvailableJobs(request: Request, env: Env, runnerId: string): Promise<Response> {
   try {
     // Update runner last seen
-    await updateRunnerLastSeen(env, runnerId);
+    if (!(await updateRunnerLastSeen(env, runnerId))) {
+      return runnerNotFoundResponse();
+    }
 
     // Parse query parameters
     const url = new URL(request.url);
@@ -147,13 +168,139 @@ export async function handleGetAvailableJobs(request: Request, env: Env, runnerI
   }
 }
 
+/**
+ * Handle long poll for available jobs
+ *
+ * Holds the request open until matching jobs are available or the wait
+ * time elapses. Returns 200 with jobs, or 204 if none became available.
+ */
+export async function handleLongPollJobs(request: Request, env: Env, runnerId: string): Promise<Response> {
+  try {
+    // Update runner last seen
+    if (!(await updateRunnerLastSeen(env, runnerId))) {
+      return runnerNotFoundResponse();
+    }
+
+    // Parse query parameters
+    const url = new URL(request.url);
+    const types = url.searchParams.getAll('types[]');
+    const timeoutParam = Number(url.searchParams.get('timeout'));
+    const wait = Number.isFinite(timeoutParam) && timeoutParam > 0
+      ? Math.min(timeoutParam * 1000, LONG_POLL.MAX_WAIT)
+      : LONG_POLL.DEFAULT_WAIT;
+
+    if (types.length === 0) {
+      return new Response(null, { status: 204 });
+    }
+
+    const deadline = Date.now() + wait;
+
+    while (true) {
+      const jobs = await getAvailableJobs(env, types);
+
+      if (jobs.length > 0) {
+        const availableJobs: AvailableJob[] = jobs.map(job => ({
+          job_id: job.id,
+          job_type: job.job_type,
+          input_params: JSON.parse(job.input_params),
+          created_at: job.created_at,
+        }));
+
+        return new Response(JSON.stringify({ jobs: availableJobs }), {
+          status: 200,
+          headers: { 'Content-Type': 'application/json' },
+        });
+      }
+
+      const remaining = deadline - Date.now();
+      if (remaining <= 0) {
+        return new Response(null, { status: 204 });
+      }
+
+      await new Promise(resolve => setTimeout(resolve, Math.min(LONG_POLL.CHECK_INTERVAL, remaining)));
+    }
+  } catch (error) {
+    return new Response(JSON.stringify({
+      error: 'Failed to poll for available jobs',
+      details: error instanceof Error ? error.message : 'Unknown error'
+    }), {
+      status: 500,
+      headers: { 'Content-Type': 'application/json' },
+    });
+  }
+}
+
+/**
+ * Handle poll and claim job
+ *
+ * Claims the oldest pending job of the requested types in a single round
+ * trip. Returns 200 with the claimed job, or 204 if none is available.
+ * Runners wait for jobs with the long poll endpoint, which only reads.
+ */
+export async function handlePollAndClaimJob(request: Request, env: Env, runnerId: string): Promise<Response> {
+  try {
+    const body = await request.json() as PollAndClaimJobRequest;
+    const { types } = body;
+
+    if (!types || !Array.isArray(types) || !types.every(t => typeof t === 'string')) {
+      return new Response(JSON.stringify({
+        error: 'Invalid request body. Expected { types: string[] }'
+      }), {
+        status: 400,
+        headers: { 'Content-Type': 'application/json' },
+      });
+    }
+
+    // Update runner last seen
+    if (!(await updateRunnerLastSeen(env, runnerId))) {
+      return runnerNotFoundResponse();
+    }
+
+    if (types.length === 0) {
+      return new Response(null, { status: 204 });
+    }
+
+    const job = await claimNextJob(env, types, runnerId);
+
+    if (!job) {
+      return new Response(null, { status: 204 });
+    }
+
+    const response: ClaimJobResponse = {
+      success: true,
+      message: 'Job claimed successfully',
+      job: {
+        job_id: job.id,
+        job_type: job.job_type,
+        input_params: JSON.parse(job.input_params),
+      },
+    };
+
+    return new Response(JSON.stringify(response), {
+      status: 200,
+      headers: { 'Content-Type': 'application/json' },
+    });
+  } catch (error) {
+    console.error('Error in handlePollAndClaimJob:', error);
+    return new Response(JSON.stringify({
+      error: 'Failed to poll and claim job',
+      details: error instanceof Error ? error.message : 'Unknown error'
+    }), {
+      status: 500,
+      headers: { 'Content-Type': 'application/json' },
+    });
+  }
+}
+
 /**
  * Handle claim job
  */
 export async function handleClaimJob(request: Request, env: Env, jobId: string, runnerId: string): Promise<Response> {
   try {
     // Update runner last seen
-    await updateRunnerLastSeen(env, runnerId);
+    if (!(await updateRunnerLastSeen(env, runnerId))) {
+      return runnerNotFoundResponse();
+    }
 
     // Try to claim the job
     const result = await claimJob(env, jobId, runnerId);
@@ -208,13 +355,129 @@ export async function handleClaimJob(request: Request, env: Env, jobId: string,
   }
 }
 
+/**
+ * Handle claim any job (claims the first pending job out of a list)
+ */
+export async function handleClaimAnyJob(request: Request, env: Env, runnerId: string): Promise<Response> {
+  try {
+    const body = await request.json() as ClaimAnyJobRequest;
+    const { job_ids } = body;
+
+    if (!job_ids || !Array.isArray(job_ids) || job_ids.length === 0 || !job_ids.every(id => typeof id === 'string')) {
+      return new Response(JSON.stringify({
+        error: 'Invalid request body. Expected { job_ids: string[] }'
+      }), {
+        status: 400,
+        headers: { 'Content-Type': 'application/json' },
+      });
+    }
+
+    if (job_ids.length > SIZE_LIMITS.CLAIM_ANY_JOB_IDS) {
+      return new Response(JSON.stringify({
+        error: `Too many job IDs (max ${SIZE_LIMITS.CLAIM_ANY_JOB_IDS})`
+      }), {
+        status: 400,
+        headers: { 'Content-Type': 'application/json' },
+      });
+    }
+
+    // Update runner last seen
+    if (!(await updateRunnerLastSeen(env, runnerId))) {
+      return runnerNotFoundResponse();
+    }
+
+    // Try to claim one of the jobs
+    const result = await claimAnyJob(env, job_ids, runnerId);
+
+    if (!result.success || !result.job) {
+      const response: ClaimJobResponse = {
+        success: false,
+        message: result.error || 'Failed to claim job',
+      };
+      return new Response(JSON.stringify(response), {
+        status: 409,
+        headers: { 'Content-Type': 'application/json' },
+      });
+    }
+
+    // The claim returns the job row, so there is no separate lookup that could miss
+    const job = result.job;
+
+    const response: ClaimJobResponse = {
+      success: true,
+      message: 'Job claimed successfully',
+      job: {
+        job_id: job.id,
+        job_type: job.job_type,
+        input_params: JSON.parse(job.input_params),
+      },
+    };
+
+    return new Response(JSON.stringify(response), {
+      status: 200,
+      headers: { 'Content-Type': 'application/json' },
+    });
+  } catch (error) {
+    console.error('Error in handleClaimAnyJob:', error);
+    return new Response(JSON.stringify({
+      error: 'Failed to claim job',
+      details: error instanceof Error ? error.message : 'Unknown error'
+    }), {
+      status: 500,
+      headers: { 'Content-Type': 'application/json' },
+    });
+  }
+}
+
+/**
+ * Handle release job (returns a claimed job to the queue)
+ */
+export async function handleReleaseJob(request: Request, env: Env, jobId: string, runnerId: string): Promise<Response> {
+  try {
+    // Update runner last seen
+    await updateRunnerLastSeen(env, runnerId);
+
+    const result = await releaseJob(env, jobId, runnerId);
+
+    if (!result.success) {
+      const response: ReleaseJobResponse = {
+        success: false,
+        message: result.error || 'Failed to release job',
+      };
+      return new Response(JSON.stringify(response), {
+        status: 409,
+        headers: { 'Content-Type': 'application/json' },
+      });
+    }
+
+    const response: ReleaseJobResponse = {
+      success: true,
+      message: 'Job released successfully',
+    };
+
+    return new Response(JSON.stringify(response), {
+      status: 200,
+      headers: { 'Content-Type': 'application/json' },
+    });
+  } catch (error) {
+    console.error('Error in handleReleaseJob:', error);
+    return new Response(JSON.stringify({
+      error: 'Failed to release job',
+      details: error instanceof Error ? error.message : 'Unknown error'
+    }), {
+      status: 500,
+      headers: { 'Content-Type': 'application/json' },
+    });
+  }
+}
+
 /**
  * Handle heartbeat
  */
 export async function handleHeartbeat(request: Request, env: Env, jobId: string, runnerId: string): Promise<Response> {
   try {
-    const body = await request.json() as HeartbeatRequest;
-    const { progress_current, progress_total, console_output } = body;
+    const body = await readJsonBody<HeartbeatRequest>(request);
+    const { progress_current, progress_total, console_output, console_append } = body;
 
     // Validate console output size
     const validation = validateConsoleOutput(console_output);
@@ -229,7 +492,7 @@ export async function handleHeartbeat(request: Request, env: Env, jobId: string,
     await updateRunnerLastSeen(env, runnerId);
 
     // Update job heartbeat
-    const result = await updateJobHeartbeat(env, jobId, runnerId, progress_current, progress_total, console_output);
+    const result = await updateJobHeartbeat(env, jobId, runnerId, progress_current, progress_total, console_output, console_append === true);
 
     if (!result.success) {
       const response: HeartbeatResponse = {
@@ -245,6 +508,7 @@ export async function handleHeartbeat(request: Request, env: Env, jobId: string,
     const response: HeartbeatResponse = {
       success: true,
       message: 'Heartbeat updated successfully',
+      console_append_supported: true,
     };
 
     return new Response(JSON.stringify(response), {
@@ -252,6 +516,12 @@ export async function handleHeartbeat(request: Request, env: Env, jobId: string,
       headers: { 'Content-Type': 'application/json' },
     });
   } catch (error) {
+    if (error instanceof BodyTooLargeError) {
+      return new Response(JSON.stringify({ error: error.message }), {
+        status: 413,
+        headers: { 'Content-Type': 'application/json' },
+      });
+    }
     return new Response(JSON.stringify({
       error: 'Failed to update heartbeat',
       details: error instanceof Error ? error.message : 'Unknown error'
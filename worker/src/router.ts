@@ -7,7 +7,11 @@ import {
   handleRegisterRunner,
   handleVerifyRunner,
   handleGetAvailableJobs,
+  handleLongPollJobs,
   handleClaimJob,
+  handleClaimAnyJob,
+  handlePollAndClaimJob,
+  handleReleaseJob,
   handleHeartbeat,
   handleCompleteJob,
   handleErrorJob,
@@ -227,6 +231,87 @@ export async function handleRequest(request: Request, env: Env): Promise<Respons
       });
     }
 
+    // Long poll for available jobs
+    if (path === '/api/runner/jobs/poll' && method === 'GET' && runnerId) {
+      const auth = verifyAuth(request, env, 'runner');
+      if (!auth.authorized) {
+        return new Response(JSON.stringify(auth.error), {
+          status: 401,
+          headers: { ...corsHeaders, 'Content-Type': 'application/json' },
+        });
+      }
+
+      const rateLimitKey = getRateLimitKeyForRunner(runnerId, 'available');
+      const rateLimit = checkRateLimit(rateLimitKey, RATE_LIMITS.RUNNER_HEARTBEAT);
+      if (!rateLimit.allowed) {
+        return new Response(JSON.stringify({
+          error: 'Rate limit exceeded',
+          resetTime: rateLimit.resetTime
+        }), {
+          status: 429,
+          headers: { ...corsHeaders, 'Content-Type': 'application/json' },
+        });
+      }
+
+      const response = await handleLongPollJobs(request, env, runnerId);
+      const responseHeaders = new Headers(response.headers);
+      Object.entries(corsHeaders).forEach(([key, value]) => responseHeaders.set(key, value));
+      return new Response(response.body, {
+        status: response.status,
+        headers: responseHeaders,
+      });
+    }
+
+    // Poll for and claim the next available job
+    if (path === '/api/runner/jobs/poll-and-claim' && method === 'POST' && runnerId) {
+      const auth = verifyAuth(request, env, 'runner');
+      if (!auth.authorized) {
+        return new Response(JSON.stringify(auth.error), {
+          status: 401,
+          headers: { ...corsHeaders, 'Content-Type': 'application/json' },
+        });
+      }
+
+      const rateLimitKey = getRateLimitKeyForRunner(runnerId, 'available');
+      const rateLimit = checkRateLimit(rateLimitKey, RATE_LIMITS.RUNNER_HEARTBEAT);
+      if (!rateLimit.allowed) {
+        return new Response(JSON.stringify({
+          error: 'Rate limit exceeded',
+          resetTime: rateLimit.resetTime
+        }), {
+          status: 429,
+          headers: { ...corsHeaders, 'Content-Type': 'application/json' },
+        });
+      }
+
+      const response = await handlePollAndClaimJob(request, env, runnerId);
+      const responseHeaders = new Headers(response.headers);
+      Object.entries(corsHeaders).forEach(([key, value]) => responseHeaders.set(key, value));
+      return new Response(response.body, {
+        status: response.status,
+        headers: responseHeaders,
+      });
+    }
+
+    // Claim any of a list of jobs
+    if (path === '/api/runner/jobs/claim' && method === 'POST' && runnerId) {
+      const auth = verifyAuth(request, env, 'runner');
+      if (!auth.authorized) {
+        return new Response(JSON.stringify(auth.error), {
+          status: 401,
+          headers: { ...corsHeaders, 'Content-Type': 'application/json' },
+        });
+      }
+
+      const response = await handleClaimAnyJob(request, env, runnerId);
+      const responseHeaders = new Headers(response.headers);
+      Object.entries(corsHeaders).forEach(([key, value]) => responseHeaders.set(key, value));
+      return new Response(response.body, {
+        status: response.status,
+        headers: responseHeaders,
+      });
+    }
+
     // Claim job
     const claimMatch = path.match(/^\/api\/runner\/jobs\/([^/]+)\/claim$/);
     if (claimMatch && method === 'POST' && runnerId) {
@@ -248,6 +333,27 @@ export async function handleRequest(request: Request, env: Env): Promise<Respons
       });
     }
 
+    // Release job
+    const releaseMatch = path.match(/^\/api\/runner\/jobs\/([^/]+)\/release$/);
+    if (releaseMatch && method === 'POST' && runnerId) {
+      const auth = verifyAuth(request, env, 'runner');
+      if (!auth.authorized) {
+        return new Response(JSON.stringify(auth.error), {
+          status: 401,
+          headers: { ...corsHeaders, 'Content-Type': 'application/json' },
+        });
+      }
+
+      const jobId = releaseMatch[1];
+      const response = await handleReleaseJob(request, env, jobId, runnerId);
+      const responseHeaders = new Headers(response.headers);
+      Object.entries(corsHeaders).forEach(([key, value]) => responseHeaders.set(key, value));
+      return new Response(response.body, {
+        status: response.status,
+        headers: responseHeaders,
+      });
+    }
+
     // Heartbeat
     const heartbeatMatch = path.match(/^\/api\/runner\/jobs\/([^/]+)\/heartbeat$/);
     if (heartbeatMatch && method === 'POST' && runnerId) {
@@ -120,15 +120,30 @@ export interface ClaimJobResponse {
   };
 }
 
+export interface PollAndClaimJobRequest {
+  types: string[]; // Job types the runner can handle
+}
+
+export interface ClaimAnyJobRequest {
+  job_ids: string[]; // Candidate job IDs, the first pending one is claimed
+}
+
+export interface ReleaseJobResponse {
+  success: boolean;
+  message: string;
+}
+
 export interface HeartbeatRequest {
   progress_current: number;
   progress_total: number;
   console_output: string;
+  console_append?: boolean; // Append console_output to the stored output instead of replacing it
 }
 
 export interface HeartbeatResponse {
   success: boolean;
   message: string;
+  console_append_supported?: boolean; // Lets runners know they may send console_append deltas
 }
 
 export interface CompleteJobRequest {
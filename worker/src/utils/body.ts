@@ -0,0 +1,44 @@
+import { SIZE_LIMITS } from '../config';
+
+/**
+ * Thrown when a request body is larger than allowed once decompressed
+ */
+export class BodyTooLargeError extends Error {}
+
+/**
+ * Parse a JSON request body, decompressing it first if it was sent with
+ * Content-Encoding: gzip. Stops reading once the decompressed body exceeds
+ * maxBytes, so a small compressed body can't expand without bound.
+ */
+export async function readJsonBody<T>(request: Request, maxBytes: number = SIZE_LIMITS.DECOMPRESSED_BODY): Promise<T> {
+  const encoding = request.headers.get('Content-Encoding');
+
+  if (encoding && encoding.toLowerCase() === 'gzip' && request.body) {
+    const reader = request.body.pipeThrough(new DecompressionStream('gzip')).getReader();
+    const chunks: Uint8Array[] = [];
+    let total = 0;
+
+    while (true) {
+      const { done, value } = await reader.read();
+      if (done) {
+        break;
+      }
+      total += value.byteLength;
+      if (total > maxBytes) {
+        await reader.cancel();
+        throw new BodyTooLargeError(`Decompressed request body exceeds size limit of ${maxBytes} bytes`);
+      }
+      chunks.push(value);
+    }
+
+    const body = new Uint8Array(total);
+    let offset = 0;
+    for (const chunk of chunks) {
+      body.set(chunk, offset);
+      offset += chunk.byteLength;
+    }
+    return JSON.parse(new TextDecoder().decode(body)) as T;
+  }
+
+  return await request.json() as T;
+}